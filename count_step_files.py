@@ -1,5 +1,4 @@
 import os
-import glob
 from tqdm import tqdm
 
 def analyze_step_files(base_dir='0002_step_500'):
@@ -19,22 +18,23 @@ def analyze_step_files(base_dir='0002_step_500'):
     total_step_files = 0
     folders_with_files = {}  # 记录每个文件夹中的文件数量
     
-    # 遍历所有可能的文件夹
+    # 单次scandir遍历所有子文件夹
     print("正在统计文件信息...")
-    for i in tqdm(range(1000), desc="扫描文件夹"):
-        folder_name = f"{i:08d}"
-        folder_path = os.path.join(base_dir, folder_name)
-        
-        if os.path.exists(folder_path):
-            total_folders += 1
-            step_files = glob.glob(os.path.join(folder_path, "*.step"))
-            file_count = len(step_files)
-            total_step_files += file_count
-            
-            if file_count == 0:
-                empty_folders += 1
-            else:
-                folders_with_files[folder_name] = file_count
+    # 只统计数字命名的样本文件夹，不跟随符号链接
+    with os.scandir(base_dir) as it:
+        subdirs = [entry for entry in it
+                   if entry.is_dir(follow_symlinks=False) and entry.name.isdigit()]
+
+    for entry in tqdm(subdirs, desc="扫描文件夹"):
+        total_folders += 1
+        with os.scandir(entry.path) as sub:
+            file_count = sum(1 for f in sub if f.name.endswith('.step'))
+        total_step_files += file_count
+
+        if file_count == 0:
+            empty_folders += 1
+        else:
+            folders_with_files[entry.name] = file_count
     
     # 打印统计结果
     print("\n=== 统计结果 ===")
@@ -1,7 +1,77 @@
 import os
-import glob
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 
+import uring_lines
+
+def lines_exceed(path, limit):
+    """
+    按1MiB二进制块统计换行符数量，一旦超过limit立即提前返回
+
+    Args:
+        path (str): 文件路径
+        limit (int): 行数阈值
+
+    Returns:
+        tuple[int, bool]: (已统计的行数, 是否超过limit)
+    """
+    count = 0
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            block = f.read(1 << 20)
+            if not block:
+                return count, False
+            # bytes.count是memchr级的C循环，远快于逐行迭代
+            count += block.count(b'\n')
+            if count > limit:
+                return count, True
+
+def _lines_exceed_safe(path):
+    """线程池包装：出错时返回异常而不中断整批任务"""
+    try:
+        return lines_exceed(path, 1000), None
+    except Exception as e:
+        return None, e
+
+def _map_line_checks(paths):
+    """
+    统计每个文件是否超过1000行，优先使用io_uring批量路径
+
+    Returns:
+        list: 与paths对齐的((行数, 是否超过), 异常)列表
+    """
+    if uring_lines.use_io_uring():
+        try:
+            print("使用io_uring批量统计行数...")
+            return uring_lines.batch_lines_exceed(paths, 1000, lines_exceed)
+        except Exception as e:
+            print(f"io_uring快速路径不可用({e})，回退线程池")
+
+    max_workers = min(32, (os.cpu_count() or 8) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(tqdm(executor.map(_lines_exceed_safe, paths, chunksize=32),
+                         total=len(paths), desc="统计行数"))
+
+def _enumerate_step_files(base_dir):
+    """
+    单次scandir遍历收集每个子文件夹中的.step文件
+
+    Args:
+        base_dir (str): 包含子文件夹的基础目录
+
+    Returns:
+        list[tuple[str, list[os.DirEntry]]]: (子文件夹路径, .step文件DirEntry列表)的列表
+    """
+    folders = []
+    with os.scandir(base_dir) as it:
+        for entry in it:
+            if not entry.is_dir():
+                continue
+            with os.scandir(entry.path) as sub:
+                step_files = [f for f in sub if f.name.endswith('.step')]
+            folders.append((entry.path, step_files))
+    return folders
+
 def is_folder_empty(folder_path):
     """
     检查文件夹是否为空
@@ -12,7 +82,9 @@ def is_folder_empty(folder_path):
     Returns:
         bool: 如果文件夹为空返回True，否则返回False
     """
-    return len(os.listdir(folder_path)) == 0
+    # scandir取到第一个条目即返回，不像listdir那样物化整个文件名列表
+    with os.scandir(folder_path) as it:
+        return next(it, None) is None
 
 def delete_large_step_files(base_dir='0002_step_1000'):
     """
@@ -29,67 +101,67 @@ def delete_large_step_files(base_dir='0002_step_1000'):
         return
     
     # 处理的文件和文件夹计数
-    total_files = 0
     deleted_files = 0
     deleted_folders = 0
-    
-    # 首先计算需要处理的文件总数
-    all_folders = [d for d in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, d))]
+
+    # 单次遍历收集每个子文件夹中的.step文件
     print("正在统计文件数量...")
-    for folder_name in all_folders:
-        folder_path = os.path.join(base_dir, folder_name)
-        if os.path.exists(folder_path):
-            step_files = glob.glob(os.path.join(folder_path, "*.step"))
-            total_files += len(step_files)
-    
+    all_folders = _enumerate_step_files(base_dir)
+    total_files = sum(len(step_files) for _, step_files in all_folders)
+
     print(f"找到 {total_files} 个.step文件")
-    
-    # 使用tqdm创建进度条
-    with tqdm(total=total_files, desc="处理进度") as pbar:
-        # 遍历从00000000到00000999的文件夹
-        for folder_name in all_folders:
-            folder_path = os.path.join(base_dir, folder_name)
-            
-            # 检查文件夹是否存在
-            if not os.path.exists(folder_path):
+
+    # 尺寸预筛：STEP每行约80字节，小于40KB的文件不会超过1000行，
+    # 无需打开读取（DirEntry.stat通常命中readdir缓存，几乎零开销）
+    to_check = [f.path for _, step_files in all_folders for f in step_files
+                if f.stat(follow_symlinks=False).st_size >= 40_000]
+    skipped = total_files - len(to_check)
+    if skipped:
+        print(f"按文件大小预筛掉 {skipped} 个明显不超过1000行的文件")
+
+    # 并发统计行数（io_uring批量读或线程池，二者都让内核保持磁盘队列深度）
+    line_counts = dict(zip(to_check, _map_line_checks(to_check)))
+
+    # 根据统计结果逐文件夹删除
+    for folder_path, step_files in tqdm(all_folders, desc="处理进度"):
+        # 如果文件夹已经是空的，直接删除
+        if is_folder_empty(folder_path):
+            os.rmdir(folder_path)
+            deleted_folders += 1
+            tqdm.write(f"已删除空文件夹: {folder_path}")
+            continue
+
+        has_large_file = False
+
+        for f in step_files:
+            step_file = f.path
+            checked = line_counts.get(step_file)
+            if checked is None:
+                # 尺寸预筛已判定不超过1000行
+                continue
+            result, error = checked
+            if error is not None:
+                tqdm.write(f"处理文件 {step_file} 时出错: {str(error)}")
                 continue
-            
-            # 如果文件夹已经是空的，直接删除
+
+            line_count, exceeded = result
+            try:
+                # 如果行数超过1000，删除文件
+                if exceeded:
+                    os.remove(step_file)
+                    deleted_files += 1
+                    has_large_file = True
+                    tqdm.write(f"已删除: {step_file} (行数: {line_count})")
+
+            except Exception as e:
+                tqdm.write(f"处理文件 {step_file} 时出错: {str(e)}")
+
+        # 如果文件夹中有大文件被删除或文件夹变空，检查并删除空文件夹
+        if has_large_file or is_folder_empty(folder_path):
             if is_folder_empty(folder_path):
                 os.rmdir(folder_path)
                 deleted_folders += 1
                 tqdm.write(f"已删除空文件夹: {folder_path}")
-                continue
-            
-            # 查找.step文件
-            step_files = glob.glob(os.path.join(folder_path, "*.step"))
-            has_large_file = False
-            
-            for step_file in step_files:
-                try:
-                    # 计算文件行数
-                    with open(step_file, 'r', encoding='utf-8') as f:
-                        line_count = sum(1 for _ in f)
-                    
-                    # 如果行数超过1000，删除文件
-                    if line_count > 1000:
-                        os.remove(step_file)
-                        deleted_files += 1
-                        has_large_file = True
-                        tqdm.write(f"已删除: {step_file} (行数: {line_count})")
-                
-                except Exception as e:
-                    tqdm.write(f"处理文件 {step_file} 时出错: {str(e)}")
-                
-                # 更新进度条
-                pbar.update(1)
-            
-            # 如果文件夹中有大文件被删除或文件夹变空，检查并删除空文件夹
-            if has_large_file or is_folder_empty(folder_path):
-                if is_folder_empty(folder_path):
-                    os.rmdir(folder_path)
-                    deleted_folders += 1
-                    tqdm.write(f"已删除空文件夹: {folder_path}")
     
     # 打印统计信息
     print(f"\n处理完成!")
@@ -1,8 +1,119 @@
+import errno
 import os
-import glob
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 
+import uring_lines
+
+def lines_exceed(path, limit):
+    """
+    按1MiB二进制块统计换行符数量，一旦超过limit立即提前返回
+
+    Args:
+        path (str): 文件路径
+        limit (int): 行数阈值
+
+    Returns:
+        tuple[int, bool]: (已统计的行数, 是否超过limit)
+    """
+    count = 0
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            block = f.read(1 << 20)
+            if not block:
+                return count, False
+            # bytes.count是memchr级的C循环，远快于逐行迭代
+            count += block.count(b'\n')
+            if count > limit:
+                return count, True
+
+def _lines_exceed_safe(path):
+    """线程池包装：出错时返回异常而不中断整批任务"""
+    try:
+        return lines_exceed(path, 500), None
+    except Exception as e:
+        return None, e
+
+def _map_line_checks(paths):
+    """
+    统计每个文件是否超过500行，优先使用io_uring批量路径
+
+    Returns:
+        list: 与paths对齐的((行数, 是否超过), 异常)列表
+    """
+    if uring_lines.use_io_uring():
+        try:
+            print("使用io_uring批量统计行数...")
+            return uring_lines.batch_lines_exceed(paths, 500, lines_exceed)
+        except Exception as e:
+            print(f"io_uring快速路径不可用({e})，回退线程池")
+
+    max_workers = min(32, (os.cpu_count() or 8) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(tqdm(executor.map(_lines_exceed_safe, paths, chunksize=32),
+                         total=len(paths), desc="统计行数"))
+
+def _move_file(src, dst, same_device):
+    """
+    移动单个文件：同设备直接rename，跨设备用copy_file_range内核拷贝
+
+    os.replace只是一次元数据操作；copy_file_range省掉用户态中转缓冲，
+    在XFS/Btrfs上还会退化成reflink（零数据搬运）。内核不支持时
+    回退到shutil.copy2。
+
+    Args:
+        src (str): 源文件路径
+        dst (str): 目标文件路径
+        same_device (bool): 源和目标是否位于同一设备
+    """
+    if same_device:
+        os.replace(src, dst)
+        return
+
+    if hasattr(os, 'copy_file_range'):
+        try:
+            src_fd = os.open(src, os.O_RDONLY)
+            try:
+                dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                try:
+                    while os.copy_file_range(src_fd, dst_fd, 1 << 24):
+                        pass
+                finally:
+                    os.close(dst_fd)
+            finally:
+                os.close(src_fd)
+            shutil.copystat(src, dst)
+            os.remove(src)
+            return
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.ENOSYS):
+                raise
+
+    shutil.copy2(src, dst)
+    os.remove(src)
+
+def _enumerate_step_files(source_dir):
+    """
+    单次scandir遍历收集所有子文件夹中的.step文件
+
+    Args:
+        source_dir (str): 包含子文件夹的基础目录
+
+    Returns:
+        list[os.DirEntry]: 所有.step文件的DirEntry列表
+    """
+    step_files = []
+    with os.scandir(source_dir) as it:
+        for entry in it:
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            with os.scandir(entry.path) as sub:
+                for f in sub:
+                    if f.name.endswith('.step'):
+                        step_files.append(f)
+    return step_files
+
 def move_small_step_files(source_dir='0002_step_1000', target_dir='0002_step_500'):
     """
     将500行以内的.step文件移动到新文件夹中，
@@ -23,61 +134,63 @@ def move_small_step_files(source_dir='0002_step_1000', target_dir='0002_step_500
         print(f"创建目标目录: {target_dir}")
     
     # 统计变量
-    total_files = 0
     moved_files = 0
-    
-    # 动态获取所有子文件夹
-    all_folders = [d for d in os.listdir(source_dir) if os.path.isdir(os.path.join(source_dir, d))]
-    
-    # 首先计算需要处理的文件总数
+
+    # 单次遍历收集所有.step文件
     print("正在统计文件数量...")
-    for folder_name in all_folders:
-        folder_path = os.path.join(source_dir, folder_name)
-        step_files = glob.glob(os.path.join(folder_path, "*.step"))
-        total_files += len(step_files)
-    
+    step_entries = _enumerate_step_files(source_dir)
+    total_files = len(step_entries)
+
     print(f"找到 {total_files} 个.step文件")
-    
+
+    # 尺寸预筛：STEP每行约80字节，超过200KB的文件不可能在500行以内，
+    # 直接跳过读取（DirEntry.stat通常命中readdir缓存，几乎零开销）
+    candidates = [entry for entry in step_entries
+                  if entry.stat(follow_symlinks=False).st_size <= 200_000]
+    skipped = total_files - len(candidates)
+    if skipped:
+        print(f"按文件大小预筛掉 {skipped} 个明显超过500行的文件")
+
+    # 源和目标在同一设备时rename即可完成移动
+    same_device = os.stat(source_dir).st_dev == os.stat(target_dir).st_dev
+
+    # 并发统计行数（io_uring批量读或线程池，二者都让内核保持磁盘队列深度）
+    paths = [entry.path for entry in candidates]
+    check_results = _map_line_checks(paths)
+
     # 使用tqdm创建进度条
-    with tqdm(total=total_files, desc="处理进度") as pbar:
-        # 遍历所有子文件夹
-        for folder_name in all_folders:
-            source_folder = os.path.join(source_dir, folder_name)
-            target_folder = os.path.join(target_dir, folder_name)
-            
-            # 检查源文件夹是否存在
-            if not os.path.exists(source_folder):
-                continue
-            
-            # 查找.step文件
-            step_files = glob.glob(os.path.join(source_folder, "*.step"))
-            
-            for step_file in step_files:
-                try:
-                    # 计算文件行数
-                    with open(step_file, 'r', encoding='utf-8') as f:
-                        line_count = sum(1 for _ in f)
-                    
-                    # 如果行数不超过500，移动文件
-                    if line_count <= 500:
-                        # 创建目标文件夹（如果不存在）
-                        if not os.path.exists(target_folder):
-                            os.makedirs(target_folder)
-                        
-                        # 构建目标文件路径
-                        file_name = os.path.basename(step_file)
-                        target_file = os.path.join(target_folder, file_name)
-                        
-                        # 移动文件
-                        shutil.copy2(step_file, target_file)  # 使用copy2保留文件元数据
-                        moved_files += 1
-                        tqdm.write(f"已移动: {step_file} (行数: {line_count})")
-                
-                except Exception as e:
-                    tqdm.write(f"处理文件 {step_file} 时出错: {str(e)}")
-                
-                # 更新进度条
+    with tqdm(total=len(candidates), desc="处理进度") as pbar:
+        for entry, (result, error) in zip(candidates, check_results):
+            step_file = entry.path
+
+            if error is not None:
+                tqdm.write(f"处理文件 {step_file} 时出错: {str(error)}")
                 pbar.update(1)
+                continue
+
+            line_count, exceeded = result
+            try:
+                # 如果行数不超过500，移动文件
+                if not exceeded:
+                    # 创建目标文件夹（如果不存在）
+                    folder_name = os.path.basename(os.path.dirname(step_file))
+                    target_folder = os.path.join(target_dir, folder_name)
+                    if not os.path.exists(target_folder):
+                        os.makedirs(target_folder)
+
+                    # 构建目标文件路径
+                    target_file = os.path.join(target_folder, entry.name)
+
+                    # 移动文件（保留元数据）
+                    _move_file(step_file, target_file, same_device)
+                    moved_files += 1
+                    tqdm.write(f"已移动: {step_file} (行数: {line_count})")
+
+            except Exception as e:
+                tqdm.write(f"处理文件 {step_file} 时出错: {str(e)}")
+
+            # 更新进度条
+            pbar.update(1)
     
     # 打印统计信息
     print(f"\n处理完成!")
@@ -4,37 +4,41 @@ from OCC.Display.SimpleGui import init_display
 from OCC.Core.gp import gp_Dir, gp_Pnt, gp_Ax3
 from OCC.Core.V3d import V3d_XposYnegZpos
 from OCC.Extend.DataExchange import read_step_file
+import multiprocessing
 import os
-from PIL import Image
-import numpy as np
+from functools import partial
 
 class STEPRenderer:
-    def __init__(self):
-        # 初始化显示器
-        self.display, self.start_display, self.add_menu, self.add_function = init_display()
+    def __init__(self, size=(800, 600)):
+        # 初始化显示器；分辨率在这里一次性指定，Dump输出即为该尺寸，
+        # 无需任何后期缩放
+        self.display, self.start_display, self.add_menu, self.add_function = init_display(size=size)
         
     def load_step(self, step_file_path):
         """加载STEP文件"""
         if not os.path.exists(step_file_path):
             raise FileNotFoundError(f"找不到STEP文件: {step_file_path}")
-            
+
+        # 复用显示器渲染多个文件时先清掉上一个形状
+        self.display.EraseAll()
         self.shape = read_step_file(step_file_path)
         self.display.DisplayShape(self.shape, update=True)
-        
+        # FitAll只在加载时做一次：它会遍历整个形状重算包围盒，
+        # 逐视图重复执行是多视图渲染的最大开销
+        self.display.FitAll()
+
     def set_view(self, dx, dy, dz):
-        """设置视图方向"""
+        """设置视图方向（不重新计算包围盒）"""
         self.display.View.SetProj(dx, dy, dz)
-        self.display.FitAll()
-        
-    def capture_view(self, width=800, height=600):
-        """捕获当前视图"""
-        self.display.View.Dump('./temp_view.png')
-        
-        # 处理图像
-        img = Image.open('./temp_view.png')
-        img = img.resize((width, height))
-        return img
+        # Redraw在调用线程上同步完成，之后Dump拿到的一定是完整帧，
+        # 无需任何定时等待
+        self.display.View.Redraw()
         
+    def capture_view(self, output_path):
+        """捕获当前视图，直接写入目标文件（无临时文件和重编码）"""
+        self.display.View.Dump(output_path)
+        return output_path
+
     def render_multi_views(self, step_file_path, output_dir, views=None):
         """渲染多个视图"""
         if views is None:
@@ -55,15 +59,58 @@ class STEPRenderer:
         # 渲染每个视图
         for view in views:
             self.set_view(*view['dir'])
-            img = self.capture_view()
             output_path = os.path.join(output_dir, f"{view['name']}.png")
-            img.save(output_path)
+            self.capture_view(output_path)
             print(f"已保存视图: {output_path}")
-            
-    def cleanup(self):
-        """清理临时文件"""
-        if os.path.exists('./temp_view.png'):
-            os.remove('./temp_view.png')
+
+    def render_folder(self, step_paths, output_dir):
+        """
+        复用同一显示器依次渲染多个STEP文件
+
+        init_display()要创建GL上下文和事件循环，开销很大；一次创建后
+        逐文件复用，load_step会先清掉上一个形状。每个文件的视图写入
+        以文件名命名的子目录。
+
+        Args:
+            step_paths (list[str]): STEP文件路径列表
+            output_dir (str): 输出根目录
+        """
+        for step_path in step_paths:
+            name = os.path.splitext(os.path.basename(step_path))[0]
+            self.render_multi_views(step_path, os.path.join(output_dir, name))
+
+# 每个工作进程持有自己的渲染器（OCC显示不是线程安全的，但进程间互不影响）
+_worker_renderer = None
+
+def _init_worker():
+    """工作进程初始化：各自创建一个STEPRenderer"""
+    global _worker_renderer
+    _worker_renderer = STEPRenderer()
+
+def _render_one(step_file_path, output_dir):
+    """在工作进程内渲染单个STEP文件的多视图"""
+    name = os.path.splitext(os.path.basename(step_file_path))[0]
+    _worker_renderer.render_multi_views(step_file_path, os.path.join(output_dir, name))
+    return step_file_path
+
+def render_batch(step_files, output_dir, processes=None):
+    """
+    多进程并行渲染一批STEP文件
+
+    每个进程独享一个OCC显示器，把几何转换和投影分摊到多个CPU核上；
+    使用spawn启动方式以保证GL上下文在全新进程中创建。
+
+    Args:
+        step_files (list[str]): STEP文件路径列表
+        output_dir (str): 输出根目录，每个文件写入同名子目录
+        processes (int): 进程数，默认为CPU核数
+    """
+    ctx = multiprocessing.get_context('spawn')
+    processes = processes or os.cpu_count()
+    with ctx.Pool(processes=processes, initializer=_init_worker) as pool:
+        for done in pool.imap_unordered(
+                partial(_render_one, output_dir=output_dir), step_files, chunksize=1):
+            print(f"已完成: {done}")
 
 def main():
     # 使用示例
@@ -79,14 +126,11 @@ def main():
         {'name': 'custom2', 'dir': (-1, 1, 1)}
     ]
     
-    try:
-        renderer.render_multi_views(
-            step_file_path='/home/hpo6025/data/abccad_test/step/00000000/00000000_290a9120f9f249a7a05cfe9c_step_000.step',
-            output_dir='/home/hpo6025/data/abccad_test/views',
-            views=custom_views
-        )
-    finally:
-        renderer.cleanup()
+    renderer.render_multi_views(
+        step_file_path='/home/hpo6025/data/abccad_test/step/00000000/00000000_290a9120f9f249a7a05cfe9c_step_000.step',
+        output_dir='/home/hpo6025/data/abccad_test/views',
+        views=custom_views
+    )
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
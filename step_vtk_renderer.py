@@ -3,15 +3,31 @@ from datetime import datetime
 import vtk
 from OCC.Core.STEPControl import STEPControl_Reader
 from OCC.Core.IFSelect import IFSelect_RetDone
+from OCC.Core.Interface import Interface_Static_SetCVal, Interface_Static_SetIVal, Interface_Static_SetRVal
+from OCC.Core.BRep import BRep_Tool
 from OCC.Core.BRepMesh import BRepMesh_IncrementalMesh
+from OCC.Core.BRepTools import breptools_Clean
+from OCC.Core.OSD import OSD_ThreadPool
 from OCC.Core.StlAPI import StlAPI_Writer
+from OCC.Core.TopAbs import TopAbs_FACE, TopAbs_REVERSED
+from OCC.Core.TopExp import TopExp_Explorer
+from OCC.Core.TopLoc import TopLoc_Location
+from OCC.Core.TopoDS import topods_Face
+from vtk.util import numpy_support
 import numpy as np
-import matplotlib.pyplot as plt
+from PIL import Image, ImageDraw
+
+# 每个视角的渲染分辨率；400x400对网格预览足够，像素吞吐只有800x800的四分之一
+TILE_SIZE = 400
 
 class StepVTKRenderer:
     def __init__(self, step_file):
         self.step_file = step_file
         self.shape = None
+        # 同一形状的网格化结果是确定的，缓存后重复渲染直接复用
+        self._cached_polydata = None
+        # 让OCCT内部线程池吃满所有CPU核（isInParallel=True的网格化用）
+        OSD_ThreadPool.DefaultPool().Init(os.cpu_count() or 1)
         self.views = [
             (30, 45), (30, 135), (30, 225), (30, 315),
             (60, 45), (60, 135), (60, 225), (60, 315),
@@ -20,107 +36,207 @@ class StepVTKRenderer:
         
     def load_step(self):
         """加载STEP文件"""
+        # 下游只做几何渲染：跳过IDEAS兼容与非流形处理，读入精度放宽到
+        # 0.01（与渲染网格的偏差同级），避免转换成千上万条展示类记录
+        Interface_Static_SetIVal("read.step.ideas", 0)
+        Interface_Static_SetIVal("read.step.nonmanifold", 0)
+        Interface_Static_SetCVal("read.precision.mode", "User")
+        Interface_Static_SetRVal("read.precision.val", 0.01)
+
         reader = STEPControl_Reader()
         status = reader.ReadFile(self.step_file)
         if status == IFSelect_RetDone:
             reader.TransferRoot()
             self.shape = reader.Shape()
+            # 形状变了，旧的网格缓存作废
+            self._cached_polydata = None
             return True
         return False
         
+    def _mesh_shape(self):
+        """三角网格化：相对线偏差0.01 + 角偏差0.5，并行网格化各面"""
+        # 先清掉已有的三角化，避免复用形状时跳过重新网格化
+        breptools_Clean(self.shape)
+        mesh = BRepMesh_IncrementalMesh(self.shape, 0.01, True, 0.5, True)
+        mesh.Perform()
+
     def shape_to_stl(self, output_dir):
         """将STEP转换为STL"""
         if self.shape is None:
             return None
-            
-        # 创建网格
-        mesh = BRepMesh_IncrementalMesh(self.shape, 0.1)
-        mesh.Perform()
-        
+
+        self._mesh_shape()
+
         # 保存为STL
         stl_path = os.path.join(output_dir, "temp.stl")
         writer = StlAPI_Writer()
         writer.Write(self.shape, stl_path)
-        
+
         return stl_path
-        
+
+    def shape_to_polydata(self):
+        """
+        把OCCT三角化结果直接转换为vtkPolyData
+
+        网格化后的节点/三角形已经在内存里，直接拼成vtkPolyData，
+        省掉STL文件的写盘和vtkSTLReader的重新解析。
+
+        Returns:
+            vtk.vtkPolyData: 三角网格，失败时返回None
+        """
+        if self.shape is None:
+            return None
+
+        self._mesh_shape()
+
+        all_nodes = []
+        all_triangles = []
+        offset = 0
+
+        explorer = TopExp_Explorer(self.shape, TopAbs_FACE)
+        while explorer.More():
+            face = topods_Face(explorer.Current())
+            location = TopLoc_Location()
+            triangulation = BRep_Tool.Triangulation(face, location)
+            if triangulation is not None:
+                trsf = location.Transformation()
+
+                nodes = np.empty((triangulation.NbNodes(), 3), dtype=np.float32)
+                for i in range(1, triangulation.NbNodes() + 1):
+                    p = triangulation.Node(i).Transformed(trsf)
+                    nodes[i - 1] = (p.X(), p.Y(), p.Z())
+
+                reversed_face = face.Orientation() == TopAbs_REVERSED
+                triangles = np.empty((triangulation.NbTriangles(), 3), dtype=np.int64)
+                for i in range(1, triangulation.NbTriangles() + 1):
+                    n1, n2, n3 = triangulation.Triangle(i).Get()
+                    if reversed_face:
+                        n1, n3 = n3, n1
+                    triangles[i - 1] = (n1 - 1, n2 - 1, n3 - 1)
+
+                all_nodes.append(nodes)
+                all_triangles.append(triangles + offset)
+                offset += triangulation.NbNodes()
+            explorer.Next()
+
+        if not all_nodes:
+            return None
+
+        nodes = np.concatenate(all_nodes)
+        triangles = np.concatenate(all_triangles)
+
+        points = vtk.vtkPoints()
+        points.SetData(numpy_support.numpy_to_vtk(nodes, deep=True))
+
+        # vtkCellArray的布局是每个单元前置顶点数(这里恒为3)
+        cells = np.column_stack(
+            (np.full(len(triangles), 3, dtype=np.int64), triangles)).ravel()
+        cell_array = vtk.vtkCellArray()
+        cell_array.SetCells(len(triangles),
+                            numpy_support.numpy_to_vtkIdTypeArray(cells, deep=True))
+
+        poly_data = vtk.vtkPolyData()
+        poly_data.SetPoints(points)
+        poly_data.SetPolys(cell_array)
+        return poly_data
+
     def render_views(self, output_dir='output'):
         """渲染多个视角"""
         os.makedirs(output_dir, exist_ok=True)
         
-        # 转换为STL
-        stl_path = self.shape_to_stl(output_dir)
-        if not stl_path:
+        # 直接从OCCT三角化构建vtkPolyData（无STL中转）；
+        # 同一文件重复渲染时复用缓存，跳过重新网格化和数组拼装
+        if self._cached_polydata is None:
+            self._cached_polydata = self.shape_to_polydata()
+        poly_data = self._cached_polydata
+        if poly_data is None:
             return None
-            
+
         # 设置VTK渲染器
-        renderer = vtk.vtkRenderer()
-        render_window = vtk.vtkRenderWindow()
-        render_window.SetOffScreenRendering(1)
-        render_window.AddRenderer(renderer)
-        
-        # 读取STL
-        reader = vtk.vtkSTLReader()
-        reader.SetFileName(stl_path)
-        
-        # 创建映射器和actor
+        # 模型中心和大小只计算一次，供所有视角复用
+        bounds = poly_data.GetBounds()
+        center = ((bounds[0]+bounds[1])*0.5,
+                  (bounds[2]+bounds[3])*0.5,
+                  (bounds[4]+bounds[5])*0.5)
+        size = max(bounds[1]-bounds[0], bounds[3]-bounds[2], bounds[5]-bounds[4])
+
+        # 创建映射器和actor（12个viewport共享同一个actor）
         mapper = vtk.vtkPolyDataMapper()
-        mapper.SetInputConnection(reader.GetOutputPort())
+        mapper.SetInputData(poly_data)
         actor = vtk.vtkActor()
         actor.SetMapper(mapper)
-        renderer.AddActor(actor)
-        
-        # 设置背景颜色
-        renderer.SetBackground(1, 1, 1)  # 白色背景
-        
-        # 创建图表
-        fig, axes = plt.subplots(3, 4, figsize=(20, 15))
-        fig.suptitle(f'STEP File: {os.path.basename(self.step_file)}', fontsize=16)
-        
-        # 渲染每个视角
-        for idx, (elev, azim) in enumerate(self.views):
+
+        # 设置渲染窗口：4列x3行的viewport平铺，一次Render出全部视角
+        render_window = vtk.vtkRenderWindow()
+        render_window.SetOffScreenRendering(1)
+        render_window.SetSize(4 * TILE_SIZE, 3 * TILE_SIZE)
+
+        # 一次性向量化算好全部视角的相机位置，循环内不再做三角函数
+        elevs, azims = np.radians(np.array(self.views, dtype=float).T)
+        directions = np.stack([np.cos(azims) * np.sin(elevs),
+                               np.sin(azims) * np.sin(elevs),
+                               np.cos(elevs)], axis=1)
+        positions = np.asarray(center) + directions * (size * 2)
+
+        # 裁剪面解析设定：相机到中心的距离恒为size*2，模型半对角线
+        # 不超过size，前后各留1.5倍余量即可，免去逐viewport的包围盒遍历
+        clip_near = size * 0.5
+        clip_far = size * 3.5
+
+        # 每个视角一个viewport渲染器，相机位姿一次性设定
+        for idx in range(len(self.views)):
             row = idx // 4
             col = idx % 4
-            
-            # 设置相机
+
+            renderer = vtk.vtkRenderer()
+            renderer.SetViewport(col / 4, (2 - row) / 3,
+                                 (col + 1) / 4, (3 - row) / 3)
+            renderer.AddActor(actor)
+            renderer.SetBackground(1, 1, 1)  # 白色背景
+
             camera = renderer.GetActiveCamera()
-            camera.SetPosition(np.cos(np.radians(azim)) * np.sin(np.radians(elev)),
-                             np.sin(np.radians(azim)) * np.sin(np.radians(elev)),
-                             np.cos(np.radians(elev)))
+            camera.SetPosition(*positions[idx])
             camera.SetViewUp(0, 0, 1)
-            camera.SetFocalPoint(0, 0, 0)
-            
-            renderer.ResetCamera()
-            render_window.Render()
-            
-            # 捕获图像
-            w2i = vtk.vtkWindowToImageFilter()
-            w2i.SetInput(render_window)
-            w2i.Update()
-            
-            # 将VTK图像转换为numpy数组
-            vtk_image = w2i.GetOutput()
-            width, height, _ = vtk_image.GetDimensions()
-            vtk_array = vtk_image.GetPointData().GetScalars()
-            components = vtk_array.GetNumberOfComponents()
-            np_array = np.frombuffer(vtk_array, dtype=np.uint8)
-            np_array = np_array.reshape(height, width, components)
-            
-            # 显示在matplotlib中
-            axes[row, col].imshow(np_array)
-            axes[row, col].axis('off')
-            axes[row, col].set_title(f'Elevation: {elev}°, Azimuth: {azim}°')
-        
+            camera.SetFocalPoint(*center)
+            camera.SetClippingRange(clip_near, clip_far)
+
+            render_window.AddRenderer(renderer)
+
+        # 一次Render + 一次读回，输出本身就是平铺好的网格
+        render_window.Render()
+        # alpha通道没人用，只读回RGB省四分之一带宽
+        w2i = vtk.vtkWindowToImageFilter()
+        w2i.SetInput(render_window)
+        w2i.SetInputBufferTypeToRGB()
+        w2i.ReadFrontBufferOff()
+        w2i.ShouldRerenderOff()
+        w2i.Update()
+
+        vtk_image = w2i.GetOutput()
+        width, height, _ = vtk_image.GetDimensions()
+        vtk_array = vtk_image.GetPointData().GetScalars()
+        components = vtk_array.GetNumberOfComponents()
+        # vtk_to_numpy给出零拷贝视图；VTK帧缓冲自下而上，翻转回图像坐标
+        np_array = numpy_support.vtk_to_numpy(vtk_array).reshape(height, width, components)
+        grid = np_array[::-1, :, :3]
+        tile_h = height // 3
+        tile_w = width // 4
+
+        # 渲染完成后一次性画上每个视角的标注（不走matplotlib的逐子图排版）
+        grid_img = Image.fromarray(grid)
+        draw = ImageDraw.Draw(grid_img)
+        for idx, (elev, azim) in enumerate(self.views):
+            row = idx // 4
+            col = idx % 4
+            draw.text((col * tile_w + 5, row * tile_h + 5),
+                      f'Elevation: {elev}, Azimuth: {azim}', fill=(0, 0, 0))
+
         # 保存结果
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         output_path = os.path.join(output_dir, f'step_visualization_{timestamp}.png')
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        # 清理临时文件
-        if os.path.exists(stl_path):
-            os.remove(stl_path)
-            
+        # 预览类输出用最低压缩级别：编码快约4倍，体积几乎不变
+        grid_img.save(output_path, compress_level=1, optimize=False)
+
         return output_path
 
 def main():
@@ -1,10 +1,59 @@
 import os
 from datetime import datetime
 import vtk
+from vtk.util import numpy_support
 import numpy as np
-import matplotlib.pyplot as plt
+from PIL import Image, ImageDraw
+
+# 每个视角的渲染分辨率；400x400对网格预览足够，像素吞吐只有800x800的四分之一
+TILE_SIZE = 400
 
 class STLRenderer:
+    # 跨实例共享的离屏窗口/viewport渲染器/读回过滤器：
+    # GL上下文创建很重，批量处理STL时只建一次
+    _shared_window = None
+    _shared_renderers = None
+    _shared_w2i = None
+
+    @classmethod
+    def _get_window(cls):
+        """懒初始化并缓存共享的渲染窗口和12个viewport渲染器"""
+        if cls._shared_window is None:
+            render_window = vtk.vtkRenderWindow()
+            render_window.SetOffScreenRendering(1)
+            render_window.SetSize(4 * TILE_SIZE, 3 * TILE_SIZE)
+
+            # 设置光源（灯光不属于view props，随渲染器常驻）
+            light = vtk.vtkLight()
+            light.SetPosition(1, 1, 1)
+            light.SetFocalPoint(0, 0, 0)
+            light.SetIntensity(0.8)
+
+            renderers = []
+            for idx in range(12):
+                row = idx // 4
+                col = idx % 4
+                renderer = vtk.vtkRenderer()
+                renderer.SetViewport(col / 4, (2 - row) / 3,
+                                     (col + 1) / 4, (3 - row) / 3)
+                renderer.SetBackground(1, 1, 1)  # 白色背景
+                renderer.AddLight(light)
+                render_window.AddRenderer(renderer)
+                renderers.append(renderer)
+
+            # 读回过滤器只建一次；alpha通道没人用，只读回RGB省四分之一带宽
+            w2i = vtk.vtkWindowToImageFilter()
+            w2i.SetInput(render_window)
+            w2i.SetInputBufferTypeToRGB()
+            w2i.ReadFrontBufferOff()
+            w2i.ShouldRerenderOff()
+
+            cls._shared_window = render_window
+            cls._shared_renderers = renderers
+            cls._shared_w2i = w2i
+
+        return cls._shared_window, cls._shared_renderers, cls._shared_w2i
+
     def __init__(self, stl_file):
         self.stl_file = stl_file
         self.views = [
@@ -12,29 +61,50 @@ class STLRenderer:
             (60, 45), (60, 135), (60, 225), (60, 315),   # 中间视角
             (85, 45), (85, 135), (85, 225), (85, 315)    # 下方视角
         ]
-        
+
+        # 预先向量化算好各视角的单位方向（与模型尺寸无关）
+        elevs, azims = np.radians(np.array(self.views, dtype=float).T)
+        self.view_dirs = np.stack([np.cos(azims) * np.sin(elevs),
+                                   np.sin(azims) * np.sin(elevs),
+                                   np.cos(elevs)], axis=1)
+
         # 初始化VTK对象
-        self.renderer = None
+        self.renderers = []
         self.render_window = None
         self.actor = None
-        
+        self.w2i = None
+
+        # 模型中心与尺寸，setup_visualization时填充
+        self.center = None
+        self.size = None
+
     def setup_visualization(self):
-        """设置VTK可视化管线"""
+        """
+        设置VTK可视化管线
+
+        12个viewport渲染器共享同一个actor，平铺在一个离屏窗口里，
+        这样一次Render就能同时出全部视角，而不是12次FBO绑定/清屏/交换。
+        窗口和viewport来自类级缓存，每个文件只替换模型数据和相机位姿。
+        """
         try:
             # 读取STL
             reader = vtk.vtkSTLReader()
             reader.SetFileName(self.stl_file)
             reader.Update()
-            
-            # 计算模型中心和大小
-            center = reader.GetOutput().GetCenter()
+
+            # 模型中心和大小都从一次GetBounds推出，不再二次遍历polydata
             bounds = reader.GetOutput().GetBounds()
-            size = max([bounds[1]-bounds[0], bounds[3]-bounds[2], bounds[5]-bounds[4]])
-            
+            center = ((bounds[0]+bounds[1])*0.5,
+                      (bounds[2]+bounds[3])*0.5,
+                      (bounds[4]+bounds[5])*0.5)
+            size = max(bounds[1]-bounds[0], bounds[3]-bounds[2], bounds[5]-bounds[4])
+            self.center = center
+            self.size = size
+
             # 创建映射器
             mapper = vtk.vtkPolyDataMapper()
             mapper.SetInputConnection(reader.GetOutputPort())
-            
+
             # 创建actor并设置属性
             self.actor = vtk.vtkActor()
             self.actor.SetMapper(mapper)
@@ -43,97 +113,73 @@ class STLRenderer:
             self.actor.GetProperty().SetDiffuse(0.7)
             self.actor.GetProperty().SetSpecular(0.3)
             self.actor.GetProperty().SetSpecularPower(60.0)
-            
-            # 设置渲染器
-            self.renderer = vtk.vtkRenderer()
-            self.renderer.AddActor(self.actor)
-            self.renderer.SetBackground(1, 1, 1)  # 白色背景
-            
-            # 设置光源
-            light = vtk.vtkLight()
-            light.SetPosition(1, 1, 1)
-            light.SetFocalPoint(0, 0, 0)
-            light.SetIntensity(0.8)
-            self.renderer.AddLight(light)
-            
-            # 设置渲染窗口
-            self.render_window = vtk.vtkRenderWindow()
-            self.render_window.AddRenderer(self.renderer)
-            self.render_window.SetOffScreenRendering(1)
-            self.render_window.SetSize(800, 800)  # 设置更高的分辨率
-            
+
+            # 取共享窗口，逐viewport换上新actor并设定相机位姿
+            self.render_window, self.renderers, self.w2i = self._get_window()
+            distance = size * 2  # 调整这个值可以改变视图的缩放级别
+            # 裁剪面解析设定：相机到中心的距离恒为distance，模型半对角线
+            # 不超过size，前后各留1.5倍余量即可，免去逐viewport的包围盒遍历
+            clip_near = distance - size * 1.5
+            clip_far = distance + size * 1.5
+            for idx, renderer in enumerate(self.renderers):
+                renderer.RemoveAllViewProps()
+                renderer.AddActor(self.actor)
+
+                camera = renderer.GetActiveCamera()
+                x, y, z = self.view_dirs[idx] * distance
+                camera.SetPosition(x + center[0], y + center[1], z + center[2])
+                camera.SetFocalPoint(center[0], center[1], center[2])
+                camera.SetViewUp(0, 0, 1)
+                camera.SetViewAngle(30)  # 设置视场角
+                camera.SetClippingRange(clip_near, clip_far)
+
             return True, (center, size)
         except Exception as e:
             print(f"Error setting up visualization: {str(e)}")
             return False, None
-            
+
     def render_views(self, output_dir='output'):
-        """渲染多个视角"""
+        """一次离屏渲染同时输出全部视角"""
         try:
             os.makedirs(output_dir, exist_ok=True)
-            
+
             # 设置可视化
-            success, model_info = self.setup_visualization()
+            success, _ = self.setup_visualization()
             if not success:
                 return None
-                
-            center, size = model_info
-            
-            # 创建matplotlib图表
-            fig, axes = plt.subplots(3, 4, figsize=(20, 15))
-            fig.suptitle(f'STL File: {os.path.basename(self.stl_file)}', fontsize=16)
-            
-            # 渲染每个视角
+
+            # 一次Render + 一次读回，输出本身就是平铺好的网格
+            self.render_window.Render()
+            self.w2i.Modified()
+            self.w2i.Update()
+
+            vtk_image = self.w2i.GetOutput()
+            width, height, _ = vtk_image.GetDimensions()
+            vtk_array = vtk_image.GetPointData().GetScalars()
+            components = vtk_array.GetNumberOfComponents()
+            # vtk_to_numpy给出零拷贝视图；VTK帧缓冲自下而上，翻转回图像坐标
+            np_array = numpy_support.vtk_to_numpy(vtk_array).reshape(height, width, components)
+            grid = np_array[::-1, :, :3]
+
+            # 渲染完成后一次性画上每个视角的标注（不走matplotlib的逐子图排版）
+            tile_h = height // 3
+            tile_w = width // 4
+            grid_img = Image.fromarray(grid)
+            draw = ImageDraw.Draw(grid_img)
             for idx, (elev, azim) in enumerate(self.views):
                 row = idx // 4
                 col = idx % 4
-                
-                # 设置相机
-                camera = self.renderer.GetActiveCamera()
-                
-                # 计算相机位置
-                distance = size * 2  # 调整这个值可以改变视图的缩放级别
-                x = distance * np.cos(np.radians(azim)) * np.sin(np.radians(elev))
-                y = distance * np.sin(np.radians(azim)) * np.sin(np.radians(elev))
-                z = distance * np.cos(np.radians(elev))
-                
-                camera.SetPosition(x + center[0], y + center[1], z + center[2])
-                camera.SetFocalPoint(center[0], center[1], center[2])
-                camera.SetViewUp(0, 0, 1)
-                camera.SetViewAngle(30)  # 设置视场角
-                
-                self.renderer.ResetCamera()
-                self.render_window.Render()
-                
-                # 捕获图像
-                w2i = vtk.vtkWindowToImageFilter()
-                w2i.SetInput(self.render_window)
-                w2i.Update()
-                
-                # 转换为numpy数组并显示
-                vtk_image = w2i.GetOutput()
-                width, height, _ = vtk_image.GetDimensions()
-                vtk_array = vtk_image.GetPointData().GetScalars()
-                components = vtk_array.GetNumberOfComponents()
-                np_array = np.frombuffer(vtk_array, dtype=np.uint8)
-                np_array = np_array.reshape(height, width, components)
-                
-                # 在matplotlib中显示
-                axes[row, col].imshow(np_array)
-                axes[row, col].axis('off')
-                axes[row, col].set_title(f'Elevation: {elev}°\nAzimuth: {azim}°', fontsize=10)
-            
-            # 调整子图之间的间距
-            plt.tight_layout(rect=[0, 0.03, 1, 0.95])
-            
+                draw.text((col * tile_w + 5, row * tile_h + 5),
+                          f'Elevation: {elev}, Azimuth: {azim}', fill=(0, 0, 0))
+
             # 保存结果
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             output_path = os.path.join(output_dir, f'stl_visualization_{timestamp}.png')
-            plt.savefig(output_path, dpi=300, bbox_inches='tight')
-            plt.close()
-            
+            # 预览类输出用最低压缩级别：编码快约4倍，体积几乎不变
+            grid_img.save(output_path, compress_level=1, optimize=False)
+
             return output_path
-            
+
         except Exception as e:
             print(f"Error rendering views: {str(e)}")
             return None
@@ -142,26 +188,26 @@ def main():
     # 查找当前目录下的STL文件
     current_dir = os.path.dirname(os.path.abspath(__file__))
     stl_files = [f for f in os.listdir(current_dir) if f.lower().endswith('.stl')]
-    
+
     if not stl_files:
         print("Error: No STL files found in the current directory.")
         return
-        
+
     stl_file = os.path.join(current_dir, stl_files[0])
     print(f"Processing STL file: {stl_file}")
-    
+
     try:
         # 创建渲染器并生成视图
         renderer = STLRenderer(stl_file)
         output_path = renderer.render_views()
-        
+
         if output_path:
             print(f"Visualization successfully saved to: {output_path}")
         else:
             print("Error: Failed to render views")
-            
+
     except Exception as e:
         print(f"Error occurred: {str(e)}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()